@@ -0,0 +1,87 @@
+# export_benchmark.py
+"""Measure throughput and peak memory of the streaming attempt export.
+
+Usage:
+    POSTGRES_URL=sqlite:///./bench.db python benchmarks/export_benchmark.py --rows 1000000 [--trace-memory]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from main import (  # noqa: E402
+    ATTEMPT_EXPORT_COLUMNS,
+    GameSessionDB,
+    ProblemAttemptDB,
+    SessionLocal,
+    _attempt_export_query,
+    _csv_chunks,
+    _gzip_chunks,
+    _parquet_chunks,
+    _stream_row_batches,
+)
+
+def seed(rows):
+    """Insert a session and `rows` attempts against it"""
+    db = SessionLocal()
+    session_id = str(uuid.uuid4())
+    config_id = "benchmark-" + session_id
+    db.add(GameSessionDB(
+        id=session_id, user_id="benchmark", configuration_id=config_id,
+        difficulty_level="Easy", target_number=10
+    ))
+    start = datetime.now()
+    batch = []
+    for i in range(rows):
+        batch.append({
+            "id": str(uuid.uuid4()), "session_id": session_id, "user_id": "benchmark",
+            "addends": [i % 10, 10 - i % 10], "sum": 10, "target": 10, "correct": True,
+            "time_taken": 1.5, "timestamp": start + timedelta(milliseconds=i),
+        })
+        if len(batch) == 10000:
+            db.bulk_insert_mappings(ProblemAttemptDB, batch)
+            batch = []
+    if batch:
+        db.bulk_insert_mappings(ProblemAttemptDB, batch)
+    db.commit()
+    db.close()
+    return config_id
+
+def run(label, chunks, rows, trace_memory):
+    if trace_memory:
+        tracemalloc.start()
+    began = time.perf_counter()
+    total = sum(len(chunk) for chunk in chunks)
+    elapsed = time.perf_counter() - began
+    line = f"{label:<10} {elapsed:8.2f}s  {rows / elapsed:>10,.0f} rows/s  {total / 1e6:8.1f} MB out"
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f"  peak {peak / 1e6:6.1f} MB"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--trace-memory", action="store_true", help="report peak Python allocations (slower)")
+    args = parser.parse_args()
+
+    config_id = seed(args.rows)
+    query = _attempt_export_query(config_id, None, None, None)
+
+    run("csv", _csv_chunks(ATTEMPT_EXPORT_COLUMNS, _stream_row_batches(query)), args.rows, args.trace_memory)
+    run("csv.gz", _gzip_chunks(_csv_chunks(ATTEMPT_EXPORT_COLUMNS, _stream_row_batches(query))), args.rows, args.trace_memory)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("parquet    skipped (pyarrow not installed)")
+        return
+    run("parquet", _parquet_chunks(ATTEMPT_EXPORT_COLUMNS, _stream_row_batches(query)), args.rows, args.trace_memory)
+
+if __name__ == "__main__":
+    main()
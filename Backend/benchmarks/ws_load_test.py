@@ -0,0 +1,110 @@
+# ws_load_test.py
+"""Hold many concurrent /ws/play connections against a running server and time attempts.
+
+Usage:
+    POSTGRES_URL=sqlite:///./bench.db uvicorn main:app --port 8000 &
+    python benchmarks/ws_load_test.py --connections 2000 --attempts 20
+
+Requires the `websockets` package. Raise `ulimit -n` above the connection count.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import urllib.request
+
+import websockets
+
+SAMPLE_CONFIG = {
+    "title": "Load Test",
+    "description": "Created by ws_load_test.py",
+    "created_by": "load-test",
+    "difficulty_levels": [
+        {
+            "level_name": "Easy",
+            "target_min": 5,
+            "target_max": 10,
+            "addends": [{"min_value": 1, "max_value": 5}, {"min_value": 1, "max_value": 5}],
+            "time_limit": None,
+            "hints_available": True
+        }
+    ],
+    "starting_level": "Easy",
+    "public": False,
+    "feedback_sensitivity": 1.0,
+    "progression_criteria": {}
+}
+
+def create_config(base_url):
+    request = urllib.request.Request(
+        f"{base_url}/game-configurations/",
+        data=json.dumps(SAMPLE_CONFIG).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["id"]
+
+async def player(url, attempts, connected, start, latencies):
+    try:
+        websocket = await websockets.connect(url, open_timeout=60)
+        target = json.loads(await websocket.recv())["target_number"]
+    finally:
+        # Count failed connections too, so the start barrier never hangs
+        connected.release()
+    async with websocket:
+        # Wait until every player is connected so the server holds them all at once
+        await start.wait()
+        for i in range(attempts):
+            # Miss on all but the last attempt of each round
+            addends = [target] if i % 5 == 4 else [1, 1]
+            began = time.perf_counter()
+            await websocket.send(json.dumps({"type": "attempt", "addends": addends, "time_taken": 1.0}))
+            feedback = json.loads(await websocket.recv())
+            latencies.append(time.perf_counter() - began)
+            if feedback.get("correct"):
+                await websocket.send(json.dumps({"type": "next"}))
+                target = json.loads(await websocket.recv())["target_number"]
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--attempts", type=int, default=20)
+    args = parser.parse_args()
+
+    config_id = create_config(args.base_url)
+    url = args.base_url.replace("http", "ws", 1) + f"/ws/play/{config_id}"
+
+    connected = asyncio.Semaphore(0)
+    start = asyncio.Event()
+    latencies = []
+
+    began = time.perf_counter()
+    tasks = [
+        asyncio.create_task(player(url, args.attempts, connected, start, latencies))
+        for _ in range(args.connections)
+    ]
+    for _ in range(args.connections):
+        await connected.acquire()
+    connect_time = time.perf_counter() - began
+    print(f"{args.connections} connections open in {connect_time:.2f}s")
+
+    began = time.perf_counter()
+    start.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - began
+
+    failures = [result for result in results if isinstance(result, Exception)]
+    latencies.sort()
+    print(f"{len(latencies)} attempts in {elapsed:.2f}s ({len(latencies) / elapsed:,.0f} attempts/s)")
+    print(
+        f"latency p50 {statistics.median(latencies) * 1000:.1f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms  "
+        f"max {latencies[-1] * 1000:.1f} ms"
+    )
+    print(f"{len(failures)} failed connections")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,226 @@
+# invalidation.py
+from collections import deque
+from typing import Callable, List, NamedTuple
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class InvalidationEvent(NamedTuple):
+    topic: str
+    key: str
+    id: str
+
+# Delivered to subscribers when a backend may have missed events; drop everything
+RESET = InvalidationEvent("*", "*", "reset")
+
+class InvalidationBus:
+    """Broadcasts invalidation events to every worker.
+
+    This base class only delivers in-process, which is all a single worker needs.
+    Invalidations are idempotent, so delivery order does not matter. Each event
+    carries a unique id and only exact duplicates are dropped; clock skew
+    between hosts cannot cause a later write's event to be ignored.
+    """
+
+    def __init__(self, remembered_events: int = 4096):
+        self._subscribers: List[Callable[[InvalidationEvent], None]] = []
+        self._seen = set()
+        self._seen_order = deque(maxlen=remembered_events)
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[InvalidationEvent], None]):
+        self._subscribers.append(callback)
+
+    def publish(self, topic: str, key: str) -> InvalidationEvent:
+        """Invalidate `key` here right away, then tell the other workers"""
+        event = InvalidationEvent(topic, key, uuid.uuid4().hex)
+        self._dispatch(event)
+        self._broadcast(json.dumps(event._asdict()).encode("utf-8"))
+        return event
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _broadcast(self, payload: bytes):
+        pass
+
+    def _receive(self, payload: bytes):
+        try:
+            event = InvalidationEvent(**json.loads(payload))
+        except (ValueError, TypeError):
+            logger.warning("Ignoring malformed invalidation event %r", payload)
+            return
+        self._dispatch(event)
+
+    def _dispatch(self, event: InvalidationEvent):
+        if event is not RESET:
+            with self._lock:
+                if event.id in self._seen:
+                    return
+                if len(self._seen_order) == self._seen_order.maxlen:
+                    self._seen.discard(self._seen_order[0])
+                self._seen_order.append(event.id)
+                self._seen.add(event.id)
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Invalidation subscriber failed on %s", event)
+
+class UnixSocketBus(InvalidationBus):
+    """Single-host backend: every worker binds a datagram socket in a shared directory"""
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._socket = None
+        self._thread = None
+        self._closed = threading.Event()
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.path)
+        self._socket.settimeout(0.5)
+        self._thread = threading.Thread(target=self._listen, name="invalidation-unix", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed.set()
+        if self._thread:
+            self._thread.join()
+        if self._socket:
+            self._socket.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _broadcast(self, payload: bytes):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        sender = self._socket or socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".sock") or path == self.path:
+                continue
+            try:
+                sender.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker that owned this socket is gone
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            except OSError:
+                logger.exception("Failed to send invalidation to %s", path)
+        if sender is not self._socket:
+            sender.close()
+
+    def _listen(self):
+        while not self._closed.is_set():
+            try:
+                payload = self._socket.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                if not self._closed.is_set():
+                    logger.exception("Invalidation socket failed")
+                return
+            self._receive(payload)
+
+class PostgresBus(InvalidationBus):
+    """Multi-host backend using Postgres LISTEN/NOTIFY (requires psycopg2)"""
+
+    def __init__(self, dsn: str, channel: str = "balance_invalidation"):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._listen_connection = None
+        self._notify_connection = None
+        self._notify_lock = threading.Lock()
+        self._thread = None
+        self._closed = threading.Event()
+
+    def start(self):
+        self._listen_connection = self._connect_listener()
+        self._thread = threading.Thread(target=self._listen, name="invalidation-postgres", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed.set()
+        if self._thread:
+            self._thread.join()
+        for connection in (self._listen_connection, self._notify_connection):
+            if connection is not None:
+                connection.close()
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+
+    def _connect_listener(self):
+        connection = self._connect()
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _broadcast(self, payload: bytes):
+        with self._notify_lock:
+            for retry in (False, True):
+                try:
+                    if self._notify_connection is None or self._notify_connection.closed:
+                        self._notify_connection = self._connect()
+                    with self._notify_connection.cursor() as cursor:
+                        cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload.decode("utf-8")))
+                    return
+                except Exception:
+                    self._notify_connection = None
+                    if retry:
+                        logger.exception("Failed to publish invalidation")
+
+    def _listen(self):
+        while not self._closed.is_set():
+            try:
+                if select.select([self._listen_connection], [], [], 0.5) == ([], [], []):
+                    continue
+                self._listen_connection.poll()
+                while self._listen_connection.notifies:
+                    self._receive(self._listen_connection.notifies.pop(0).payload.encode("utf-8"))
+            except Exception:
+                if self._closed.is_set():
+                    return
+                logger.exception("Lost invalidation listener connection, reconnecting")
+                time.sleep(1)
+                try:
+                    self._listen_connection = self._connect_listener()
+                except Exception:
+                    continue
+                # Anything sent while we were disconnected is lost
+                self._dispatch(RESET)
+
+def create_bus(url: str, database_url: str = "") -> InvalidationBus:
+    """Build a bus from INVALIDATION_BUS: "local", "unix:///some/dir" or "postgres" """
+    if url == "local":
+        return InvalidationBus()
+    if url.startswith("unix://"):
+        return UnixSocketBus(url[len("unix://"):])
+    if url == "postgres":
+        return PostgresBus(database_url)
+    raise ValueError(f"Unknown invalidation bus '{url}'")
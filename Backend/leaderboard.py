@@ -0,0 +1,131 @@
+# leaderboard.py
+from sortedcontainers import SortedList
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+
+METRICS = ("correct", "accuracy", "fastest")
+
+class PlayerStats:
+    __slots__ = ("attempts", "correct", "best_time")
+
+    def __init__(self, attempts: int = 0, correct: int = 0, best_time: Optional[float] = None):
+        self.attempts = attempts
+        self.correct = correct
+        self.best_time = best_time
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.attempts if self.attempts else 0.0
+
+def _valid_time(time_taken: Optional[float]) -> bool:
+    """Only finite, positive times can rank as the fastest"""
+    return time_taken is not None and math.isfinite(time_taken) and time_taken > 0
+
+def _ranking_key(metric: str, user_id: str, stats: PlayerStats):
+    """Sort key for a player on a metric, best first; None if they are not ranked on it"""
+    if metric == "correct":
+        # Ties go to whoever needed fewer attempts
+        return (-stats.correct, stats.attempts, user_id)
+    if metric == "accuracy":
+        return (-stats.accuracy, -stats.correct, user_id)
+    if stats.best_time is None:
+        return None
+    return (stats.best_time, user_id)
+
+class Leaderboard:
+    """Rankings for one configuration and difficulty level.
+
+    Each metric is a SortedList of sort keys, so updates, top-K and rank lookups
+    are all O(log n) in the number of players.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, PlayerStats] = {}
+        self._rankings = {metric: SortedList() for metric in METRICS}
+
+    def __len__(self):
+        return len(self._stats)
+
+    def record(self, user_id: str, correct: bool, time_taken: float):
+        stats = self._stats.get(user_id)
+        if stats is None:
+            stats = self._stats[user_id] = PlayerStats()
+        else:
+            self._unrank(user_id, stats)
+
+        stats.attempts += 1
+        if correct:
+            stats.correct += 1
+            if _valid_time(time_taken) and (stats.best_time is None or time_taken < stats.best_time):
+                stats.best_time = time_taken
+        self._rank(user_id, stats)
+
+    def load(self, rows: Iterable[Tuple[str, int, int, Optional[float]]]):
+        """Replace the board with (user_id, attempts, correct, best_time) rows"""
+        self._stats = {
+            user_id: PlayerStats(attempts, correct, best_time if _valid_time(best_time) else None)
+            for user_id, attempts, correct, best_time in rows
+        }
+        for metric in METRICS:
+            keys = (_ranking_key(metric, user_id, stats) for user_id, stats in self._stats.items())
+            self._rankings[metric] = SortedList(key for key in keys if key is not None)
+
+    def top(self, metric: str, limit: int) -> List[Tuple[int, str, PlayerStats]]:
+        """Best `limit` players as (rank, user_id, stats), ranks starting at 1"""
+        return [
+            (rank, key[-1], self._stats[key[-1]])
+            for rank, key in enumerate(self._rankings[metric].islice(0, limit), start=1)
+        ]
+
+    def rank(self, metric: str, user_id: str) -> Optional[Tuple[int, PlayerStats]]:
+        stats = self._stats.get(user_id)
+        if stats is None:
+            return None
+        key = _ranking_key(metric, user_id, stats)
+        if key is None:
+            return None
+        return self._rankings[metric].index(key) + 1, stats
+
+    def _rank(self, user_id: str, stats: PlayerStats):
+        for metric in METRICS:
+            key = _ranking_key(metric, user_id, stats)
+            if key is not None:
+                self._rankings[metric].add(key)
+
+    def _unrank(self, user_id: str, stats: PlayerStats):
+        for metric in METRICS:
+            key = _ranking_key(metric, user_id, stats)
+            if key is not None:
+                self._rankings[metric].remove(key)
+
+class LeaderboardIndex:
+    """All leaderboards, keyed by (configuration_id, difficulty_level)"""
+
+    def __init__(self):
+        self._boards: Dict[Tuple[str, str], Leaderboard] = {}
+
+    def get(self, config_id: str, difficulty_level: str) -> Optional[Leaderboard]:
+        return self._boards.get((config_id, difficulty_level))
+
+    def record(self, config_id: str, difficulty_level: str, user_id: str, correct: bool, time_taken: float):
+        board = self._boards.get((config_id, difficulty_level))
+        if board is None:
+            board = self._boards[(config_id, difficulty_level)] = Leaderboard()
+        board.record(user_id, correct, time_taken)
+
+    def drop_configuration(self, config_id: str):
+        # May run on the invalidation bus thread, so snapshot the keys and tolerate races
+        for key in [key for key in list(self._boards) if key[0] == config_id]:
+            self._boards.pop(key, None)
+
+    def rebuild(self, rows: Iterable[Tuple[str, str, str, int, int, Optional[float]]]):
+        """Rebuild every board from (configuration_id, difficulty_level, user_id, attempts, correct, best_time) rows"""
+        grouped: Dict[Tuple[str, str], List[Tuple[str, int, int, Optional[float]]]] = {}
+        for config_id, difficulty_level, user_id, attempts, correct, best_time in rows:
+            grouped.setdefault((config_id, difficulty_level), []).append((user_id, attempts, correct, best_time))
+
+        boards = {}
+        for key, board_rows in grouped.items():
+            board = boards[key] = Leaderboard()
+            board.load(board_rows)
+        self._boards = boards
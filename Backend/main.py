@@ -1,14 +1,33 @@
-from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi import FastAPI, HTTPException, status, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime
 import os
+import io
+import csv
 import json
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, Float, DateTime, JSON, MetaData, Table, select, insert, update, delete
+import zlib
+import hashlib
+import math
+import queue
+import random
+import logging
+import threading
+import time
+from sqlalchemy import create_engine, Column, String, Integer, Boolean, Float, DateTime, JSON, MetaData, Table, select, insert, update, delete, func, case
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
+from progression import ProgressionCriteria, ProgressionEngine, ProgressionState
+from leaderboard import METRICS, LeaderboardIndex
+from invalidation import InvalidationEvent, create_bus
+from replicas import ReplicaRouter
+
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(title="Balance Scale Addition Game API")
@@ -20,6 +39,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Primary-Until"],
 )
 
 # Set up Vercel Postgres database connection
@@ -28,6 +48,40 @@ engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Optional read replicas, e.g. POSTGRES_REPLICA_URLS="postgresql://replica-1/db,postgresql://replica-2/db"
+REPLICA_URLS = [url.strip() for url in os.environ.get("POSTGRES_REPLICA_URLS", "").split(",") if url.strip()]
+db_router = ReplicaRouter(
+    engine,
+    [create_engine(url) for url in REPLICA_URLS],
+    stickiness=float(os.environ.get("REPLICA_STICKINESS", "5"))
+)
+
+@app.on_event("startup")
+def start_replica_health_checks():
+    db_router.start()
+
+@app.on_event("shutdown")
+def stop_replica_health_checks():
+    db_router.close()
+
+# Read-your-writes: after a write the client gets a primary-until time, as a cookie and
+# an X-Primary-Until header, and any worker honours it when either comes back
+PRIMARY_UNTIL_COOKIE = "primary_until"
+
+def mark_written(response: Response):
+    """Keep this client's reads on the primary for a while; call right after committing"""
+    until = db_router.primary_until()
+    if until is not None:
+        response.set_cookie(PRIMARY_UNTIL_COOKIE, f"{until:.3f}", max_age=math.ceil(db_router.stickiness))
+        response.headers["X-Primary-Until"] = f"{until:.3f}"
+
+def _primary_until(request: Request) -> Optional[float]:
+    value = request.headers.get("x-primary-until") or request.cookies.get(PRIMARY_UNTIL_COOKIE)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
 # Database dependency
 def get_db():
     db = SessionLocal()
@@ -36,6 +90,14 @@ def get_db():
     finally:
         db.close()
 
+# Read-only database dependency, served by a replica when one is configured
+def get_read_db(request: Request):
+    db = db_router.read_session(_primary_until(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
 # Database models
 class GameConfigurationDB(Base):
     __tablename__ = "game_configurations"
@@ -90,6 +152,15 @@ class ProblemAttemptDB(Base):
     time_taken = Column(Float, nullable=False)
     timestamp = Column(DateTime, default=datetime.now)
 
+class ProgressionStateDB(Base):
+    __tablename__ = "progression_states"
+    
+    id = Column(String, primary_key=True)  # "{user_id}:{configuration_id}"
+    user_id = Column(String, nullable=False)
+    configuration_id = Column(String, nullable=False)
+    state = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
 # Create tables if they don't exist
 Base.metadata.create_all(bind=engine)
 
@@ -152,19 +223,412 @@ class ProblemAttempt(BaseModel):
     time_taken: float = Field(..., description="Time taken in seconds")
     timestamp: datetime = Field(default_factory=datetime.now)
 
+class LeaderboardEntry(BaseModel):
+    rank: int = Field(..., description="Position on the leaderboard, starting at 1")
+    user_id: str = Field(..., description="User ID")
+    attempts: int = Field(..., description="Number of attempts at this level")
+    correct_answers: int = Field(..., description="Number of correct answers at this level")
+    accuracy: float = Field(..., description="Fraction of attempts that were correct")
+    best_time: Optional[float] = Field(None, description="Fastest correct answer in seconds")
+
+# Background persistence
+class PlayPersistence:
+    """Background writer that batches gameplay rows into few transactions.
+
+    It takes game sessions and attempts from /ws/play and progression snapshots
+    from both REST and WebSocket play. The queue is bounded, so when the database falls behind, submitters wait
+    instead of memory growing without limit.
+    """
+
+    def __init__(self, batch_size: int = 500, max_queued: int = 10000, retries: int = 2, retry_delay: float = 0.5):
+        self.batch_size = batch_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._thread = None
+        self._lock = threading.Lock()
+        # Called with (kind, row) for each row that could not be written
+        self.on_failure = None
+
+    def submit(self, kind: str, row: Dict[str, Any]):
+        """Queue a "session", "attempt" or "progress" row, blocking while the queue is full"""
+        self._ensure_started()
+        self._queue.put((kind, row))
+
+    async def submit_async(self, kind: str, row: Dict[str, Any]):
+        """Like submit, but waits for room off the event loop"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((kind, row))
+        except queue.Full:
+            await run_in_threadpool(self._queue.put, (kind, row))
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="play-persistence", daemon=True)
+                    self._thread.start()
+
+    def flush(self):
+        """Block until everything submitted so far has been written"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            # Whatever piles up while the previous batch is being written goes out together
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                failed = self._persist(items)
+                if self.on_failure:
+                    for kind, row in failed:
+                        self.on_failure(kind, row)
+            except Exception:
+                logger.exception("Failed to handle %d unwritten gameplay rows", len(items))
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _persist(self, items) -> list:
+        """Write a batch, retrying it and then falling back to one row at a time.
+
+        Returns the rows that could not be written, so one bad row only loses itself.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                self._write(items)
+                return []
+            except Exception:
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay * (attempt + 1))
+        logger.warning("Batch of %d gameplay rows failed, writing rows individually", len(items))
+
+        failed = []
+        for item in items:
+            try:
+                self._write([item])
+            except Exception:
+                logger.exception("Dropping unwritable %s row", item[0])
+                failed.append(item)
+        return failed
+
+    def _write(self, items):
+        sessions = {}
+        attempts = []
+        progress = {}
+        for kind, row in items:
+            if kind == "session":
+                sessions[row["id"]] = row
+            elif kind == "progress":
+                progress[(row["user_id"], row["configuration_id"])] = row
+            else:
+                attempts.append(row)
+
+        db = SessionLocal()
+        try:
+            if sessions:
+                existing = set(db.execute(
+                    select(GameSessionDB.id).where(GameSessionDB.id.in_(list(sessions)))
+                ).scalars())
+                new_rows = [row for session_id, row in sessions.items() if session_id not in existing]
+                changed_rows = [row for session_id, row in sessions.items() if session_id in existing]
+                if new_rows:
+                    db.bulk_insert_mappings(GameSessionDB, new_rows)
+                if changed_rows:
+                    db.bulk_update_mappings(GameSessionDB, changed_rows)
+            if attempts:
+                db.bulk_insert_mappings(ProblemAttemptDB, attempts)
+            if progress:
+                self._write_progress(db, list(progress.values()))
+            db.commit()
+        finally:
+            db.close()
+
+    def _write_progress(self, db: Session, rows: List[Dict[str, Any]]):
+        """Upsert progression states and the GameProgress rows they summarise"""
+        now = datetime.now()
+        keys = {_progression_key(row["user_id"], row["configuration_id"]): row for row in rows}
+        existing_states = set(db.execute(
+            select(ProgressionStateDB.id).where(ProgressionStateDB.id.in_(list(keys)))
+        ).scalars())
+        state_rows = [
+            {"id": key, "user_id": row["user_id"], "configuration_id": row["configuration_id"],
+             "state": row["state"], "updated_at": now}
+            for key, row in keys.items()
+        ]
+        db.bulk_insert_mappings(ProgressionStateDB, [row for row in state_rows if row["id"] not in existing_states])
+        db.bulk_update_mappings(ProgressionStateDB, [row for row in state_rows if row["id"] in existing_states])
+
+        existing_progress = {
+            (p.user_id, p.configuration_id): p.id
+            for p in db.execute(
+                select(GameProgressDB.id, GameProgressDB.user_id, GameProgressDB.configuration_id).where(
+                    GameProgressDB.user_id.in_({row["user_id"] for row in rows}),
+                    GameProgressDB.configuration_id.in_({row["configuration_id"] for row in rows})
+                )
+            )
+        }
+        new_progress = []
+        changed_progress = []
+        for row in rows:
+            state = row["state"]
+            progress_row = {
+                "user_id": row["user_id"],
+                "configuration_id": row["configuration_id"],
+                "current_level": state["level"],
+                "completed_problems": state["completed_problems"],
+                "correct_answers": state["correct_answers"],
+                "time_spent": int(state["time_spent"]),
+                "last_played": now,
+            }
+            progress_id = existing_progress.get((row["user_id"], row["configuration_id"]))
+            if progress_id:
+                changed_progress.append({"id": progress_id, **progress_row})
+            else:
+                new_progress.append({"id": str(uuid.uuid4()), **progress_row})
+        db.bulk_insert_mappings(GameProgressDB, new_progress)
+        db.bulk_update_mappings(GameProgressDB, changed_progress)
+
+play_persistence = PlayPersistence()
+
+# Configuration cache, kept coherent across workers by the invalidation bus.
+# Only configurations are coherent: leaderboards and progression states below are
+# still held per worker.
+CONFIG_CACHE_TTL = float(os.environ.get("CONFIG_CACHE_TTL", "30"))
+INVALIDATION_BUS = os.environ.get("INVALIDATION_BUS", "local")  # "local", "unix:///some/dir" or "postgres"
+
+def _progression_criteria(config: GameConfigurationDB) -> ProgressionCriteria:
+    try:
+        return ProgressionCriteria(**(config.progression_criteria or {}))
+    except ValidationError:
+        logger.warning("Invalid progression_criteria on configuration %s, using defaults", config.id)
+        return ProgressionCriteria()
+
+class CachedConfig:
+    """The parsed parts of a configuration that gameplay reads on every attempt"""
+
+    __slots__ = ("id", "updated_at", "levels", "level_names", "starting_level", "feedback_sensitivity", "criteria", "loaded_at")
+
+    def __init__(self, config: GameConfigurationDB):
+        self.id = config.id
+        self.updated_at = config.updated_at
+        self.levels = {level["level_name"]: DifficultyLevel(**level) for level in json.loads(config.difficulty_levels)}
+        self.level_names = list(self.levels)
+        self.starting_level = config.starting_level
+        self.feedback_sensitivity = config.feedback_sensitivity or 1.0
+        self.criteria = _progression_criteria(config)
+        self.loaded_at = time.monotonic()
+
+class ConfigCache:
+    """Per-worker configuration cache.
+
+    Entries are dropped when an invalidation event arrives and, as a backstop for
+    lost events, after `ttl` seconds, so no worker serves a configuration staler than that.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, CachedConfig] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+
+    def get(self, config_id: str) -> Optional[CachedConfig]:
+        entry = self._entries.get(config_id)
+        if entry and time.monotonic() - entry.loaded_at < self.ttl:
+            return entry
+        return None
+
+    def load(self, db: Session, config_id: str) -> Optional[CachedConfig]:
+        entry = self.get(config_id)
+        if entry:
+            return entry
+
+        generation = (self._epoch, self._generations.get(config_id, 0))
+        config = db.query(GameConfigurationDB).filter(GameConfigurationDB.id == config_id).first()
+        if not config:
+            return None
+        entry = CachedConfig(config)
+        # Don't cache what we read if it was invalidated while we were reading it
+        if generation == (self._epoch, self._generations.get(config_id, 0)):
+            self._entries[config_id] = entry
+        return entry
+
+    def invalidate(self, config_id: str):
+        self._generations[config_id] = self._generations.get(config_id, 0) + 1
+        self._entries.pop(config_id, None)
+
+    def clear(self):
+        self._epoch += 1
+        self._entries.clear()
+
+config_cache = ConfigCache(CONFIG_CACHE_TTL)
+invalidation_bus = create_bus(
+    INVALIDATION_BUS,
+    make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+)
+
+def _on_invalidation(event: InvalidationEvent):
+    if event.topic == "*":
+        config_cache.clear()
+    elif event.topic == "config.updated":
+        config_cache.invalidate(event.key)
+    elif event.topic == "config.deleted":
+        config_cache.invalidate(event.key)
+        leaderboards.drop_configuration(event.key)
+
+invalidation_bus.subscribe(_on_invalidation)
+
+# Adaptive difficulty progression. States live in the worker that loaded them, so a
+# user playing one configuration through several workers at once gets a window per
+# worker, and whichever snapshot is written last wins the game_progress counters.
+# Run a single worker, or route each user to one worker, if that matters.
+progression_engine = ProgressionEngine()
+
+def _progression_key(user_id: str, config_id: str) -> str:
+    return f"{user_id}:{config_id}"
+
+def _load_progression_state(db: Session, user_id: str, config: CachedConfig) -> ProgressionState:
+    """Return the user's in-memory state, loading the saved snapshot the first time"""
+    state = progression_engine.get(user_id, config.id)
+    if state:
+        return state
+
+    saved = db.query(ProgressionStateDB).filter(ProgressionStateDB.id == _progression_key(user_id, config.id)).first()
+    if saved:
+        state = ProgressionState.from_dict(saved.state)
+    else:
+        progress = db.query(GameProgressDB).filter(
+            GameProgressDB.user_id == user_id,
+            GameProgressDB.configuration_id == config.id
+        ).first()
+        state = ProgressionState(
+            progress.current_level if progress else config.starting_level,
+            config.criteria.window
+        )
+        if progress:
+            state.completed_problems = progress.completed_problems or 0
+            state.correct_answers = progress.correct_answers or 0
+            state.time_spent = float(progress.time_spent or 0)
+
+    return progression_engine.put(user_id, config.id, state)
+
+def _record_progression(
+    user_id: str,
+    config_id: str,
+    levels: List[str],
+    criteria: ProgressionCriteria,
+    correct: bool,
+    time_taken: float,
+    starting_level: Optional[str] = None
+) -> ProgressionState:
+    """Feed an attempt to the progression engine; the state must already be loaded"""
+    return progression_engine.record_attempt(
+        user_id, config_id, levels, criteria, correct, time_taken, starting_level
+    )
+
+def _persist_progression():
+    for snapshot in progression_engine.drain_dirty():
+        play_persistence.submit("progress", snapshot)
+
+def _requeue_failed_progress(kind: str, row: Dict[str, Any]):
+    # The snapshot is gone but the state is still in memory; write it next round
+    if kind == "progress":
+        progression_engine.mark_dirty(row["user_id"], row["configuration_id"])
+
+play_persistence.on_failure = _requeue_failed_progress
+
+_progression_stop = threading.Event()
+_progression_flusher = None
+
+def _flush_progression_periodically():
+    while not _progression_stop.wait(progression_engine.persist_interval):
+        try:
+            _persist_progression()
+        except Exception:
+            logger.exception("Failed to queue progression snapshots")
+
+@app.on_event("startup")
+def start_progression_flusher():
+    """Write dirty progression states every persist_interval, whether or not anyone is playing"""
+    global _progression_flusher
+    if _progression_flusher is None or not _progression_flusher.is_alive():
+        _progression_stop.clear()
+        _progression_flusher = threading.Thread(target=_flush_progression_periodically, name="progression-flush", daemon=True)
+        _progression_flusher.start()
+
+def stop_progression_flusher():
+    _progression_stop.set()
+    if _progression_flusher is not None:
+        _progression_flusher.join()
+
+# Leaderboards, updated on every attempt. Each worker only sees the attempts it
+# handled since startup, so with several workers the boards drift apart until a
+# restart rebuilds them from problem_attempts.
+LEADERBOARD_BATCH_SIZE = 1000
+
+leaderboards = LeaderboardIndex()
+
+@app.on_event("startup")
+def rebuild_leaderboards():
+    """Rebuild every leaderboard from one streamed aggregate over problem_attempts"""
+    correct = case((ProblemAttemptDB.correct == True, 1))
+    # Only positive times can be a best time, matching Leaderboard.record
+    correct_time = case(((ProblemAttemptDB.correct == True) & (ProblemAttemptDB.time_taken > 0), ProblemAttemptDB.time_taken))
+    query = (
+        select(
+            GameSessionDB.configuration_id,
+            GameSessionDB.difficulty_level,
+            ProblemAttemptDB.user_id,
+            func.count(ProblemAttemptDB.id),
+            func.count(correct),
+            func.min(correct_time),
+        )
+        .join(GameSessionDB, GameSessionDB.id == ProblemAttemptDB.session_id)
+        # Deleted configurations keep their attempts; their boards must stay dropped
+        .join(GameConfigurationDB, GameConfigurationDB.id == GameSessionDB.configuration_id)
+        .group_by(GameSessionDB.configuration_id, GameSessionDB.difficulty_level, ProblemAttemptDB.user_id)
+        .execution_options(yield_per=LEADERBOARD_BATCH_SIZE)
+    )
+    db = SessionLocal()
+    try:
+        leaderboards.rebuild(tuple(row) for row in db.execute(query))
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_invalidation_bus():
+    invalidation_bus.start()
+
+@app.on_event("shutdown")
+def flush_pending_writes():
+    stop_progression_flusher()
+    _persist_progression()
+    play_persistence.flush()
+    invalidation_bus.close()
+
+
 # Modified API endpoints to use Postgres
 @app.post("/game-configurations/", response_model=GameConfiguration)
 async def create_game_configuration(
     config: GameConfiguration,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     # Convert difficulty_levels to JSON-compatible format
     config_dict = config.dict()
     config_dict["difficulty_levels"] = json.dumps([level.dict() for level in config.difficulty_levels])
+    # The server owns updated_at; the list ETag depends on it never going backwards
+    config_dict["updated_at"] = datetime.now()
     
     db_config = GameConfigurationDB(**config_dict)
     db.add(db_config)
     db.commit()
+    mark_written(response)
     db.refresh(db_config)
     
     # Convert back to Pydantic model
@@ -173,11 +637,54 @@ async def create_game_configuration(
     
     return GameConfiguration(**result)
 
+# Conditional GET support for configurations
+CONFIG_CACHE_CONTROL = "no-cache"
+
+def _make_etag(*parts):
+    """Build a strong ETag from the given version parts"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag (weak comparison, as RFC 7232 requires)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def _not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CONFIG_CACHE_CONTROL}
+    )
+
 @app.get("/game-configurations/", response_model=List[GameConfiguration])
 async def list_game_configurations(
+    request: Request,
+    response: Response,
     public_only: bool = False,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
+    # Version the collection with one aggregate query before loading any rows
+    version_query = select(func.count(GameConfigurationDB.id), func.max(GameConfigurationDB.updated_at))
+    if public_only:
+        version_query = version_query.where(GameConfigurationDB.public == True)
+    count, last_updated = db.execute(version_query).one()
+
+    etag = _make_etag("list", public_only, count, last_updated.isoformat() if last_updated else "")
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CONFIG_CACHE_CONTROL
+
     query = select(GameConfigurationDB)
     if public_only:
         query = query.where(GameConfigurationDB.public == True)
@@ -208,8 +715,23 @@ async def list_game_configurations(
 @app.get("/game-configurations/{config_id}", response_model=GameConfiguration)
 async def get_game_configuration(
     config_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
 ):
+    # Only fetch the version columns until we know the client's copy is stale
+    version = db.execute(
+        select(GameConfigurationDB.id, GameConfigurationDB.updated_at).where(GameConfigurationDB.id == config_id)
+    ).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Game configuration not found")
+
+    etag = _make_etag(version.id, version.updated_at.isoformat() if version.updated_at else "")
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CONFIG_CACHE_CONTROL
+
     config = db.query(GameConfigurationDB).filter(GameConfigurationDB.id == config_id).first()
     if not config:
         raise HTTPException(status_code=404, detail="Game configuration not found")
@@ -236,6 +758,7 @@ async def get_game_configuration(
 async def update_game_configuration(
     config_id: str,
     updated_config: GameConfiguration,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     config = db.query(GameConfigurationDB).filter(GameConfigurationDB.id == config_id).first()
@@ -251,7 +774,9 @@ async def update_game_configuration(
         setattr(config, key, value)
     
     db.commit()
+    mark_written(response)
     db.refresh(config)
+    invalidation_bus.publish("config.updated", config_id)
     
     # Convert back to Pydantic model
     result = config_dict.copy()
@@ -262,6 +787,7 @@ async def update_game_configuration(
 @app.delete("/game-configurations/{config_id}", status_code=204)
 async def delete_game_configuration(
     config_id: str,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     config = db.query(GameConfigurationDB).filter(GameConfigurationDB.id == config_id).first()
@@ -270,26 +796,26 @@ async def delete_game_configuration(
     
     db.delete(config)
     db.commit()
+    mark_written(response)
+    invalidation_bus.publish("config.deleted", config_id)
     return None
 
 @app.post("/game-sessions/", response_model=GameSession)
 async def create_game_session(
     config_id: str,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    config = db.query(GameConfigurationDB).filter(GameConfigurationDB.id == config_id).first()
+    config = config_cache.load(db, config_id)
     if not config:
         raise HTTPException(status_code=404, detail="Game configuration not found")
     
-    # Parse difficulty levels from JSON
-    difficulty_levels = [DifficultyLevel(**level) for level in json.loads(config.difficulty_levels)]
-    
-    difficulty_level = config.starting_level
+    # Start wherever the progression engine has placed the player
+    difficulty_level = _load_progression_state(db, "anonymous", config).level
+    if difficulty_level not in config.levels:
+        difficulty_level = config.starting_level
     
-    level_config = next(
-        (level for level in difficulty_levels if level.level_name == difficulty_level),
-        None
-    )
+    level_config = config.levels.get(difficulty_level)
     
     if not level_config:
         raise HTTPException(status_code=400, detail=f"Difficulty level '{difficulty_level}' not found")
@@ -307,6 +833,7 @@ async def create_game_session(
     db_session = GameSessionDB(**session.dict())
     db.add(db_session)
     db.commit()
+    mark_written(response)
     db.refresh(db_session)
     
     return GameSession(**db_session.__dict__)
@@ -315,7 +842,8 @@ async def create_game_session(
 async def record_attempt(
     session_id: str,
     addends: List[int],
-    time_taken: float,
+    response: Response,
+    time_taken: float = Query(..., ge=0, allow_inf_nan=False),
     db: Session = Depends(get_db)
 ):
     session = db.query(GameSessionDB).filter(GameSessionDB.id == session_id).first()
@@ -346,15 +874,28 @@ async def record_attempt(
     if correct:
         session.completed = True
         session.success = True
+    config_id = session.configuration_id
+    difficulty_level = session.difficulty_level
     
     db.commit()
+    mark_written(response)
+    
+    leaderboards.record(config_id, difficulty_level, "anonymous", correct, time_taken)
+    
+    # Update adaptive difficulty for the next session
+    config = config_cache.load(db, config_id)
+    if config:
+        _load_progression_state(db, "anonymous", config)
+        _record_progression(
+            "anonymous", config.id, config.level_names, config.criteria, correct, time_taken, config.starting_level
+        )
     
     return attempt
 
 @app.get("/game-sessions/{session_id}", response_model=GameSession)
 async def get_session(
     session_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     session = db.query(GameSessionDB).filter(GameSessionDB.id == session_id).first()
     if not session:
@@ -366,6 +907,7 @@ async def get_session(
 async def complete_session(
     session_id: str,
     success: bool,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     session = db.query(GameSessionDB).filter(GameSessionDB.id == session_id).first()
@@ -379,19 +921,176 @@ async def complete_session(
     session.success = success
     
     db.commit()
+    mark_written(response)
     db.refresh(session)
     
     return GameSession(**session.__dict__)
 
+# WebSocket gameplay channel
+MAX_TILT = 20
+# Keep every sum well inside a Postgres INTEGER
+MAX_ADDENDS = 100
+MAX_ADDEND = 1_000_000
+
+def _valid_addend(addend: Any) -> bool:
+    return isinstance(addend, int) and not isinstance(addend, bool) and abs(addend) <= MAX_ADDEND
+
+def _scale_feedback(total: int, target: int, sensitivity: float) -> Dict[str, Any]:
+    """Scale imbalance for an attempt, tilting at most MAX_TILT degrees"""
+    difference = total - target
+    if difference == 0:
+        return {"difference": 0, "tilt": 0.0}
+    tilt_factor = min(abs(difference) / max(abs(target), 1) * sensitivity, 1.0)
+    return {"difference": difference, "tilt": math.copysign(tilt_factor * MAX_TILT, difference)}
+
+def _load_play_config(config_id: str) -> Optional[CachedConfig]:
+    db = SessionLocal()
+    try:
+        config = config_cache.load(db, config_id)
+        if config:
+            _load_progression_state(db, "anonymous", config)
+        return config
+    finally:
+        db.close()
+
+@app.websocket("/ws/play/{config_id}")
+async def play_websocket(websocket: WebSocket, config_id: str):
+    await websocket.accept()
+
+    config = None
+
+    async def new_round() -> Optional[GameSession]:
+        nonlocal config
+        # Re-read the configuration each round so edits reach open connections
+        config = config_cache.get(config_id)
+        if config is None or progression_engine.get("anonymous", config_id) is None:
+            config = await run_in_threadpool(_load_play_config, config_id)
+        if not config:
+            return None
+
+        progression = progression_engine.get("anonymous", config_id)
+        level_config = config.levels.get(progression.level) or config.levels.get(config.starting_level)
+        if not level_config:
+            return None
+        session = GameSession(
+            user_id="anonymous",
+            configuration_id=config_id,
+            difficulty_level=level_config.level_name,
+            target_number=random.randint(level_config.target_min, level_config.target_max)
+        )
+        await play_persistence.submit_async("session", session.dict())
+        return session
+
+    async def close_unplayable():
+        await websocket.send_json({"type": "error", "detail": "Game configuration not found or has no playable level"})
+        await websocket.close(code=4404)
+
+    async def send_round(session: GameSession):
+        await websocket.send_json({
+            "type": "round",
+            "session_id": session.id,
+            "difficulty_level": session.difficulty_level,
+            "target_number": session.target_number
+        })
+
+    session = await new_round()
+    if not session:
+        await close_unplayable()
+        return
+    await send_round(session)
+
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                kind = message["type"]
+            except (ValueError, KeyError, TypeError):
+                await websocket.send_json({"type": "error", "detail": "Malformed message"})
+                continue
+
+            if kind == "attempt":
+                if session.completed:
+                    await websocket.send_json({"type": "error", "detail": "Session already completed"})
+                    continue
+                try:
+                    addends = message["addends"]
+                    if not isinstance(addends, list) or len(addends) > MAX_ADDENDS:
+                        raise ValueError("addends must be a list of at most MAX_ADDENDS")
+                    if not all(_valid_addend(addend) for addend in addends):
+                        raise ValueError("addends must be whole numbers within MAX_ADDEND")
+                    time_taken = float(message["time_taken"])
+                except (KeyError, ValueError, TypeError, OverflowError):
+                    await websocket.send_json({"type": "error", "detail": "Malformed attempt"})
+                    continue
+                if not math.isfinite(time_taken) or time_taken < 0:
+                    await websocket.send_json({"type": "error", "detail": "time_taken must be a finite, non-negative number"})
+                    continue
+
+                total_sum = sum(addends)
+                correct = total_sum == session.target_number
+                attempt = ProblemAttempt(
+                    session_id=session.id,
+                    user_id="anonymous",
+                    addends=addends,
+                    sum=total_sum,
+                    target=session.target_number,
+                    correct=correct,
+                    time_taken=time_taken
+                )
+                await play_persistence.submit_async("attempt", attempt.dict())
+
+                session.answer_count += 1
+                if correct:
+                    session.completed = True
+                    session.success = True
+                await play_persistence.submit_async("session", session.dict())
+                leaderboards.record(config_id, session.difficulty_level, "anonymous", correct, time_taken)
+                progression = _record_progression(
+                    "anonymous", config_id, config.level_names, config.criteria, correct, time_taken,
+                    config.starting_level
+                )
+
+                await websocket.send_json({
+                    "type": "feedback",
+                    "correct": correct,
+                    "sum": total_sum,
+                    "target": session.target_number,
+                    "answer_count": session.answer_count,
+                    "level": progression.level,
+                    **_scale_feedback(total_sum, session.target_number, config.feedback_sensitivity)
+                })
+            elif kind == "complete":
+                if session.completed:
+                    await websocket.send_json({"type": "error", "detail": "Session already completed"})
+                    continue
+                success = message.get("success", False)
+                if not isinstance(success, bool):
+                    await websocket.send_json({"type": "error", "detail": "Malformed message"})
+                    continue
+                session.completed = True
+                session.success = success
+                await play_persistence.submit_async("session", session.dict())
+                await websocket.send_json({"type": "completed", "session_id": session.id, "success": session.success})
+            elif kind == "next":
+                session = await new_round()
+                if not session:
+                    await close_unplayable()
+                    return
+                await send_round(session)
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown message type '{kind}'"})
+    except WebSocketDisconnect:
+        pass
+
 @app.get("/progress/", response_model=List[GameProgress])
-async def get_user_progress(db: Session = Depends(get_db)):
+async def get_user_progress(db: Session = Depends(get_read_db)):
     progress = db.query(GameProgressDB).all()
     return [GameProgress(**p.__dict__) for p in progress]
 
 @app.get("/progress/{config_id}", response_model=GameProgress)
 async def get_game_progress(
     config_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     progress = db.query(GameProgressDB).filter(
         GameProgressDB.user_id == "anonymous",
@@ -403,19 +1102,285 @@ async def get_game_progress(
     
     return GameProgress(**progress.__dict__)
 
+def _check_metric(metric: str):
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(METRICS)}")
+
+@app.get("/leaderboards/{config_id}", response_model=List[LeaderboardEntry])
+async def get_leaderboard(
+    config_id: str,
+    difficulty_level: str,
+    metric: str = "correct",
+    limit: int = Query(10, ge=1, le=100)
+):
+    _check_metric(metric)
+    board = leaderboards.get(config_id, difficulty_level)
+    if board is None:
+        return []
+    return [
+        LeaderboardEntry(
+            rank=rank,
+            user_id=user_id,
+            attempts=stats.attempts,
+            correct_answers=stats.correct,
+            accuracy=stats.accuracy,
+            best_time=stats.best_time
+        )
+        for rank, user_id, stats in board.top(metric, limit)
+    ]
+
+@app.get("/leaderboards/{config_id}/rank/{user_id}", response_model=LeaderboardEntry)
+async def get_leaderboard_rank(
+    config_id: str,
+    user_id: str,
+    difficulty_level: str,
+    metric: str = "correct"
+):
+    _check_metric(metric)
+    board = leaderboards.get(config_id, difficulty_level)
+    ranked = board.rank(metric, user_id) if board else None
+    if ranked is None:
+        raise HTTPException(status_code=404, detail="User is not on this leaderboard")
+    
+    rank, stats = ranked
+    return LeaderboardEntry(
+        rank=rank,
+        user_id=user_id,
+        attempts=stats.attempts,
+        correct_answers=stats.correct,
+        accuracy=stats.accuracy,
+        best_time=stats.best_time
+    )
+
 @app.get("/admin/all-progress", response_model=List[GameProgress])
-async def get_all_progress(db: Session = Depends(get_db)):
+async def get_all_progress(db: Session = Depends(get_read_db)):
     progress = db.query(GameProgressDB).all()
     return [GameProgress(**p.__dict__) for p in progress]
 
 @app.get("/admin/user-attempts/{user_id}", response_model=List[ProblemAttempt])
 async def get_user_attempts(
     target_user_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     attempts = db.query(ProblemAttemptDB).filter(ProblemAttemptDB.user_id == target_user_id).all()
     return [ProblemAttempt(**a.__dict__) for a in attempts]
 
+# Streaming exports for researchers
+EXPORT_BATCH_SIZE = 1000
+# Rows buffered per Parquet row group; small groups compress poorly and bloat the footer
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+ATTEMPT_EXPORT_COLUMNS = [
+    "id", "session_id", "user_id", "configuration_id", "difficulty_level",
+    "addends", "sum", "target", "correct", "time_taken", "timestamp",
+]
+
+SESSION_EXPORT_COLUMNS = [
+    "id", "user_id", "configuration_id", "difficulty_level", "target_number",
+    "answer_count", "started_at", "completed", "success",
+]
+
+def _attempt_export_query(config_id, user_id, start, end):
+    """Build the attempts export query, joined to sessions for the configuration"""
+    query = (
+        select(
+            ProblemAttemptDB.id,
+            ProblemAttemptDB.session_id,
+            ProblemAttemptDB.user_id,
+            GameSessionDB.configuration_id,
+            GameSessionDB.difficulty_level,
+            ProblemAttemptDB.addends,
+            ProblemAttemptDB.sum,
+            ProblemAttemptDB.target,
+            ProblemAttemptDB.correct,
+            ProblemAttemptDB.time_taken,
+            ProblemAttemptDB.timestamp,
+        )
+        .join(GameSessionDB, GameSessionDB.id == ProblemAttemptDB.session_id, isouter=True)
+        .order_by(ProblemAttemptDB.timestamp)
+    )
+    if config_id:
+        query = query.where(GameSessionDB.configuration_id == config_id)
+    if user_id:
+        query = query.where(ProblemAttemptDB.user_id == user_id)
+    if start:
+        query = query.where(ProblemAttemptDB.timestamp >= start)
+    if end:
+        query = query.where(ProblemAttemptDB.timestamp < end)
+    return query
+
+def _session_export_query(config_id, user_id, start, end):
+    """Build the sessions export query"""
+    query = select(*[getattr(GameSessionDB, column) for column in SESSION_EXPORT_COLUMNS]).order_by(GameSessionDB.started_at)
+    if config_id:
+        query = query.where(GameSessionDB.configuration_id == config_id)
+    if user_id:
+        query = query.where(GameSessionDB.user_id == user_id)
+    if start:
+        query = query.where(GameSessionDB.started_at >= start)
+    if end:
+        query = query.where(GameSessionDB.started_at < end)
+    return query
+
+def _stream_row_batches(query):
+    """Yield lists of rows from a server-side cursor, EXPORT_BATCH_SIZE at a time"""
+    # The session is owned by the generator so it stays open while the response streams
+    db = db_router.read_session()
+    try:
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _csv_chunks(columns, batches):
+    """Encode row batches as CSV, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def _gzip_chunks(chunks):
+    """Gzip a stream of byte chunks on the fly"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+class _ParquetSink(io.RawIOBase):
+    """Write-only sink that hands back whatever Parquet has written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _parquet_schema(columns):
+    import pyarrow as pa
+
+    types = {
+        "addends": pa.list_(pa.int64()),
+        "sum": pa.int64(),
+        "target": pa.int64(),
+        "correct": pa.bool_(),
+        "time_taken": pa.float64(),
+        "timestamp": pa.timestamp("us"),
+        "target_number": pa.int64(),
+        "answer_count": pa.int64(),
+        "started_at": pa.timestamp("us"),
+        "completed": pa.bool_(),
+        "success": pa.bool_(),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+def _parquet_chunks(columns, batches):
+    """Encode row batches as Parquet, buffering them into row groups of about PARQUET_ROW_GROUP_SIZE rows"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(columns)
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    # Batches are converted to Arrow as they arrive; that is far more compact than the row tuples
+    buffered = []
+    buffered_rows = 0
+    try:
+        for batch in batches:
+            data = {column: [row[i] for row in batch] for i, column in enumerate(columns)}
+            buffered.append(pa.RecordBatch.from_pydict(data, schema=schema))
+            buffered_rows += len(batch)
+            if buffered_rows >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_batches(buffered, schema=schema), row_group_size=buffered_rows)
+                buffered = []
+                buffered_rows = 0
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        if buffered:
+            writer.write_table(pa.Table.from_batches(buffered, schema=schema), row_group_size=buffered_rows)
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def _export_response(name, columns, query, format, compress):
+    if format == "csv":
+        chunks = _csv_chunks(columns, _stream_row_batches(query))
+        media_type = "text/csv"
+        filename = f"{name}.csv"
+        if compress:
+            chunks = _gzip_chunks(chunks)
+            media_type = "application/gzip"
+            filename += ".gz"
+    elif format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        # Parquet pages are already zstd-compressed, so no outer gzip
+        chunks = _parquet_chunks(columns, _stream_row_batches(query))
+        media_type = "application/vnd.apache.parquet"
+        filename = f"{name}.parquet"
+    else:
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'parquet'")
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+@app.get("/admin/export/attempts")
+async def export_attempts(
+    config_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = "csv",
+    compress: bool = True
+):
+    query = _attempt_export_query(config_id, user_id, start, end)
+    return _export_response("attempts", ATTEMPT_EXPORT_COLUMNS, query, format, compress)
+
+@app.get("/admin/export/sessions")
+async def export_sessions(
+    config_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = "csv",
+    compress: bool = True
+):
+    query = _session_export_query(config_id, user_id, start, end)
+    return _export_response("sessions", SESSION_EXPORT_COLUMNS, query, format, compress)
+
 @app.post("/admin/set-admin")
 async def set_admin_role(
     target_user_id: str,
@@ -0,0 +1,208 @@
+# progression.py
+from array import array
+from bisect import bisect_left, insort
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+
+class ProgressionCriteria(BaseModel):
+    window: int = Field(10, ge=1, le=1000, description="Number of recent attempts the statistics cover")
+    min_attempts: int = Field(5, ge=1, description="Attempts needed in the window before accuracy is judged")
+    promote_accuracy: float = Field(0.8, ge=0.0, le=1.0, description="Rolling accuracy that promotes a level")
+    demote_accuracy: float = Field(0.4, ge=0.0, le=1.0, description="Rolling accuracy that demotes a level")
+    max_median_time: Optional[float] = Field(None, description="Median seconds per attempt required to promote (optional)")
+    promote_streak: Optional[int] = Field(5, ge=1, description="Correct answers in a row that promote immediately")
+    demote_streak: Optional[int] = Field(3, ge=1, description="Wrong answers in a row that demote immediately")
+
+class ProgressionState:
+    """Sliding-window statistics for one user on one configuration.
+
+    The window is a fixed-size ring buffer, so each update costs the same however
+    long the user has been playing. Accuracy and streaks update in O(1); the median
+    keeps a sorted copy of the window, so it costs an O(window) memmove per update
+    (window is capped at 1000). Outcomes are packed into an int bitmask and times
+    into float arrays to keep thousands of states cheap to hold.
+    """
+
+    __slots__ = (
+        "level", "window", "outcomes", "times", "sorted_times", "position", "count",
+        "correct", "streak", "completed_problems", "correct_answers", "time_spent",
+    )
+
+    def __init__(self, level: str, window: int):
+        self.level = level
+        self.window = window
+        self.completed_problems = 0
+        self.correct_answers = 0
+        self.time_spent = 0.0
+        self.reset_window()
+
+    def reset_window(self):
+        self.outcomes = 0
+        self.times = array("d", [0.0] * self.window)
+        self.sorted_times = array("d")
+        self.position = 0
+        self.count = 0
+        self.correct = 0
+        self.streak = 0
+
+    def record(self, correct: bool, time_taken: float):
+        """Add an attempt, evicting the oldest one once the window is full"""
+        bit = 1 << self.position
+        if self.count == self.window:
+            if self.outcomes & bit:
+                self.correct -= 1
+            evicted = self.times[self.position]
+            del self.sorted_times[bisect_left(self.sorted_times, evicted)]
+        else:
+            self.count += 1
+
+        if correct:
+            self.outcomes |= bit
+            self.correct += 1
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+        else:
+            self.outcomes &= ~bit
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+        self.times[self.position] = time_taken
+        insort(self.sorted_times, time_taken)
+        self.position = (self.position + 1) % self.window
+
+        self.completed_problems += 1
+        self.correct_answers += int(correct)
+        self.time_spent += time_taken
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.count if self.count else 0.0
+
+    @property
+    def median_time(self) -> Optional[float]:
+        if not self.count:
+            return None
+        middle = self.count // 2
+        if self.count % 2:
+            return self.sorted_times[middle]
+        return (self.sorted_times[middle - 1] + self.sorted_times[middle]) / 2
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "level": self.level,
+            "window": self.window,
+            "outcomes": self.outcomes,
+            "times": list(self.times),
+            "position": self.position,
+            "count": self.count,
+            "correct": self.correct,
+            "streak": self.streak,
+            "completed_problems": self.completed_problems,
+            "correct_answers": self.correct_answers,
+            "time_spent": self.time_spent,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProgressionState":
+        state = cls(data["level"], data["window"])
+        state.outcomes = data["outcomes"]
+        state.times = array("d", data["times"])
+        state.position = data["position"]
+        state.count = data["count"]
+        state.correct = data["correct"]
+        state.streak = data["streak"]
+        state.completed_problems = data["completed_problems"]
+        state.correct_answers = data["correct_answers"]
+        state.time_spent = data["time_spent"]
+        # Only the filled slots belong in the median
+        filled = state.times if state.count == state.window else state.times[:state.count]
+        state.sorted_times = array("d", sorted(filled))
+        return state
+
+def evaluate(state: ProgressionState, criteria: ProgressionCriteria) -> int:
+    """Return +1 to promote, -1 to demote or 0 to stay on the current level"""
+    if criteria.promote_streak and state.streak >= criteria.promote_streak:
+        return 1
+    if criteria.demote_streak and -state.streak >= criteria.demote_streak:
+        return -1
+    if state.count < criteria.min_attempts:
+        return 0
+    if state.accuracy >= criteria.promote_accuracy:
+        if criteria.max_median_time is None or state.median_time <= criteria.max_median_time:
+            return 1
+    if state.accuracy <= criteria.demote_accuracy:
+        return -1
+    return 0
+
+class ProgressionEngine:
+    """In-memory progression states, keyed by (user_id, configuration_id).
+
+    Attempts are recorded on the event loop while snapshots are drained from a
+    background thread, so both take the engine lock.
+    """
+
+    def __init__(self, persist_interval: float = 30.0):
+        self.persist_interval = persist_interval
+        self._states: Dict[Tuple[str, str], ProgressionState] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, config_id: str) -> Optional[ProgressionState]:
+        return self._states.get((user_id, config_id))
+
+    def put(self, user_id: str, config_id: str, state: ProgressionState) -> ProgressionState:
+        """Store a freshly loaded state, keeping any state another loader stored first"""
+        return self._states.setdefault((user_id, config_id), state)
+
+    def record_attempt(
+        self,
+        user_id: str,
+        config_id: str,
+        levels: List[str],
+        criteria: ProgressionCriteria,
+        correct: bool,
+        time_taken: float,
+        starting_level: Optional[str] = None
+    ) -> ProgressionState:
+        """Update the user's window and move them between levels if the criteria say so.
+
+        A user whose level has been removed from the configuration goes back to
+        `starting_level`, as a new session would, or to the first level without one.
+        """
+        key = (user_id, config_id)
+        with self._lock:
+            state = self._states[key]
+            if state.window != criteria.window:
+                # The configuration's window changed; start a fresh one at the new size
+                state.window = criteria.window
+                state.reset_window()
+            state.record(correct, time_taken)
+
+            if not levels:
+                # Nothing to move between; keep the statistics and the current level
+                pass
+            elif state.level in levels:
+                index = levels.index(state.level)
+                new_index = min(max(index + evaluate(state, criteria), 0), len(levels) - 1)
+                if new_index != index:
+                    state.level = levels[new_index]
+                    state.reset_window()
+            else:
+                state.level = starting_level if starting_level in levels else levels[0]
+                state.reset_window()
+
+            self._dirty.add(key)
+        return state
+
+    def mark_dirty(self, user_id: str, config_id: str):
+        """Queue a state to be snapshotted again, e.g. after its last write failed"""
+        with self._lock:
+            if (user_id, config_id) in self._states:
+                self._dirty.add((user_id, config_id))
+
+    def drain_dirty(self) -> List[Dict[str, Any]]:
+        """Snapshot every state changed since the last call"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return [
+                {"user_id": user_id, "configuration_id": config_id, "state": self._states[(user_id, config_id)].to_dict()}
+                for user_id, config_id in dirty
+            ]
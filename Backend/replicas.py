@@ -0,0 +1,82 @@
+# replicas.py
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker, Session
+from typing import List, Optional
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class ReplicaRouter:
+    """Routes read-only sessions to healthy replicas and everything else to the primary.
+
+    After a write the client is handed a primary-until time, `stickiness` seconds
+    ahead, and sends it back with its reads. Until then its reads go to the primary,
+    so it sees its own writes despite replication lag whichever worker serves it.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: List[Engine],
+        stickiness: float = 5.0,
+        health_interval: float = 5.0
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.stickiness = stickiness
+        self.health_interval = health_interval
+        self._primary_sessions = sessionmaker(autocommit=False, autoflush=False, bind=primary)
+        self._replica_sessions = [sessionmaker(autocommit=False, autoflush=False, bind=replica) for replica in replicas]
+        self._healthy = [True] * len(replicas)
+        self._round_robin = itertools.count()
+        self._closed = threading.Event()
+        self._thread = None
+
+    def primary_until(self) -> Optional[float]:
+        """Epoch time for a client that just wrote to keep reading from the primary until"""
+        if not self.replicas:
+            return None
+        return time.time() + self.stickiness
+
+    def read_session(self, primary_until: Optional[float] = None) -> Session:
+        """Open a session for a read-only request, given the client's primary-until time if any"""
+        now = time.time()
+        # Values further out than the window (with slack for clock skew) were not issued by us
+        if primary_until is not None and now < primary_until < now + 2 * self.stickiness:
+            return self._primary_sessions()
+        healthy = [index for index, ok in enumerate(self._healthy) if ok]
+        if not healthy:
+            return self._primary_sessions()
+        return self._replica_sessions[healthy[next(self._round_robin) % len(healthy)]]()
+
+    def check_health(self):
+        """Ping every replica once, taking failed ones out of rotation"""
+        for index, replica in enumerate(self.replicas):
+            try:
+                with replica.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                healthy = True
+            except Exception:
+                healthy = False
+            if healthy != self._healthy[index]:
+                logger.warning("Replica %s is now %s", replica.url, "healthy" if healthy else "unhealthy")
+            self._healthy[index] = healthy
+
+    def start(self):
+        if self.replicas and self._thread is None:
+            self._thread = threading.Thread(target=self._monitor, name="replica-health", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._closed.set()
+        if self._thread:
+            self._thread.join()
+
+    def _monitor(self):
+        while not self._closed.is_set():
+            self.check_health()
+            self._closed.wait(self.health_interval)
@@ -0,0 +1,80 @@
+# test_invalidation.py
+import json
+import multiprocessing
+import threading
+import time
+
+from invalidation import InvalidationBus, InvalidationEvent, UnixSocketBus
+
+WORKERS = 4
+EVENTS = 20
+CONVERGENCE_BOUND = 1.0  # seconds
+
+def test_only_exact_duplicates_are_dropped():
+    bus = InvalidationBus(remembered_events=2)
+    received = []
+    bus.subscribe(received.append)
+
+    event = bus.publish("config.updated", "abc")
+    bus._receive(json.dumps(event._asdict()).encode("utf-8"))
+    bus._receive(b"not json")
+    # A second event for the same key always gets through, whatever the publisher's clock said
+    other = InvalidationEvent("config.updated", "abc", "from-another-host")
+    bus._receive(json.dumps(other._asdict()).encode("utf-8"))
+
+    assert received == [event, other]
+
+    # Only a bounded number of ids are remembered
+    bus.publish("config.updated", "def")
+    bus._receive(json.dumps(event._asdict()).encode("utf-8"))
+    assert received[-1] == event
+
+def _worker(directory, ready, results):
+    bus = UnixSocketBus(directory)
+    seen = []
+    done = threading.Event()
+
+    def on_event(event):
+        results.put((event.key, time.time()))
+        seen.append(event)
+        if len(seen) == EVENTS:
+            done.set()
+
+    bus.subscribe(on_event)
+    bus.start()
+    ready.put(True)
+    done.wait(10)
+    bus.close()
+
+def test_workers_converge_over_unix_sockets(tmp_path):
+    directory = str(tmp_path / "bus")
+    context = multiprocessing.get_context("fork")
+    ready = context.Queue()
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(directory, ready, results)) for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.get(timeout=10)
+
+    publisher = UnixSocketBus(directory)
+    publisher.start()
+    published = {}
+    try:
+        for i in range(EVENTS):
+            key = f"config-{i}"
+            published[key] = time.time()
+            publisher.publish("config.updated", key)
+    finally:
+        publisher.close()
+
+    delays = {}
+    for _ in range(WORKERS * EVENTS):
+        key, received_at = results.get(timeout=10)
+        delays[key] = max(delays.get(key, 0.0), received_at - published[key])
+    for worker in workers:
+        worker.join(timeout=10)
+
+    assert set(delays) == set(published)
+    worst = max(delays.values())
+    assert worst < CONVERGENCE_BOUND, f"{WORKERS} workers took {worst * 1000:.2f} ms to converge"
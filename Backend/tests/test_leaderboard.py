@@ -0,0 +1,57 @@
+# test_leaderboard.py
+from leaderboard import Leaderboard, LeaderboardIndex
+
+def test_rankings_update_incrementally():
+    board = Leaderboard()
+    board.record("alice", True, 4.0)
+    board.record("alice", True, 2.5)
+    board.record("bob", True, 3.0)
+    board.record("bob", False, 9.0)
+    board.record("carol", False, 1.0)
+
+    assert [user_id for _, user_id, _ in board.top("correct", 10)] == ["alice", "bob", "carol"]
+    assert [user_id for _, user_id, _ in board.top("accuracy", 2)] == ["alice", "bob"]
+    # Carol has no correct answer, so she has no fastest time
+    assert [user_id for _, user_id, _ in board.top("fastest", 10)] == ["alice", "bob"]
+
+    board.record("bob", True, 1.0)
+    board.record("bob", True, 1.5)
+    rank, stats = board.rank("correct", "bob")
+    assert rank == 1
+    assert stats.correct == 3
+    assert board.rank("fastest", "bob")[0] == 1
+    assert board.rank("fastest", "carol") is None
+    assert board.rank("correct", "dave") is None
+
+def test_rebuild_matches_incremental_updates():
+    attempts = [("alice", True, 2.0), ("bob", False, 1.0), ("bob", True, 5.0), ("alice", False, 3.0)]
+    incremental = LeaderboardIndex()
+    for user_id, correct, time_taken in attempts:
+        incremental.record("config", "Easy", user_id, correct, time_taken)
+
+    rebuilt = LeaderboardIndex()
+    rebuilt.rebuild([
+        ("config", "Easy", "alice", 2, 1, 2.0),
+        ("config", "Easy", "bob", 2, 1, 5.0),
+    ])
+
+    for metric in ("correct", "accuracy", "fastest"):
+        expected = [(rank, user_id) for rank, user_id, _ in incremental.get("config", "Easy").top(metric, 10)]
+        actual = [(rank, user_id) for rank, user_id, _ in rebuilt.get("config", "Easy").top(metric, 10)]
+        assert actual == expected
+
+    rebuilt.drop_configuration("config")
+    assert rebuilt.get("config", "Easy") is None
+
+def test_invalid_times_never_rank_fastest():
+    board = Leaderboard()
+    board.record("mallory", True, -1000.0)
+    board.record("mallory", True, float("nan"))
+    board.record("mallory", True, 0.0)
+    board.record("alice", True, 3.0)
+
+    assert [user_id for _, user_id, _ in board.top("fastest", 10)] == ["alice"]
+    assert board.rank("correct", "mallory")[1].correct == 3
+
+    board.load([("mallory", 1, 1, -5.0), ("alice", 1, 1, 3.0)])
+    assert [user_id for _, user_id, _ in board.top("fastest", 10)] == ["alice"]
@@ -243,4 +243,552 @@ def test_record_attempt(mock_firebase_auth, auth_headers):
     
     assert attempt_response.status_code == 200
     attempt_data = attempt_response.json()
-    assert attempt_data["session_id"] == session
\ No newline at end of file
+    assert attempt_data["session_id"] == session
+
+# Test Exports
+def test_export_attempts_csv(mock_firebase_auth, auth_headers):
+    import csv
+    import gzip
+    import io
+
+    sample_config = {
+        "title": "Export Game",
+        "description": "A configuration for export tests",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": "Easy",
+                "target_min": 5,
+                "target_max": 10,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+        ],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {}
+    }
+
+    config_id = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()["id"]
+    session = client.post(f"/game-sessions/?config_id={config_id}", headers=auth_headers).json()
+    client.post(
+        f"/game-sessions/{session['id']}/attempt?time_taken=3.5",
+        json=[1, 2],
+        headers=auth_headers
+    )
+
+    response = client.get(f"/admin/export/attempts?config_id={config_id}", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode("utf-8"))))
+    assert len(rows) == 1
+    assert rows[0]["configuration_id"] == config_id
+    assert rows[0]["addends"] == "[1, 2]"
+    assert rows[0]["sum"] == "3"
+
+    plain = client.get(f"/admin/export/attempts?config_id={config_id}&compress=false", headers=auth_headers)
+    assert plain.text.splitlines()[0].startswith("id,session_id,user_id,configuration_id")
+
+def test_export_attempts_parquet(mock_firebase_auth, auth_headers):
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+
+    response = client.get("/admin/export/attempts?format=parquet", headers=auth_headers)
+
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names[:3] == ["id", "session_id", "user_id"]
+
+def test_parquet_export_buffers_row_groups():
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+    import main
+
+    batches = [[(f"{batch}-{row}", row) for row in range(3)] for batch in range(4)]
+    with patch.object(main, "PARQUET_ROW_GROUP_SIZE", 5):
+        content = b"".join(main._parquet_chunks(["id", "sum"], iter(batches)))
+
+    metadata = pq.ParquetFile(io.BytesIO(content)).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [6, 6]
+
+def test_export_rejects_unknown_format(mock_firebase_auth, auth_headers):
+    response = client.get("/admin/export/sessions?format=xlsx", headers=auth_headers)
+    assert response.status_code == 400
+
+# Test Conditional GET
+def test_game_configuration_etag(mock_firebase_auth, auth_headers):
+    sample_config = {
+        "title": "ETag Game",
+        "description": "A configuration for conditional GET tests",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": "Easy",
+                "target_min": 5,
+                "target_max": 10,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+        ],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {}
+    }
+
+    created = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()
+    config_id = created["id"]
+
+    first = client.get(f"/game-configurations/{config_id}", headers=auth_headers)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    cached = client.get(f"/game-configurations/{config_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    list_etag = client.get("/game-configurations/", headers=auth_headers).headers["etag"]
+    assert client.get("/game-configurations/", headers={**auth_headers, "If-None-Match": list_etag}).status_code == 304
+
+    created["title"] = "Updated ETag Game"
+    client.put(f"/game-configurations/{config_id}", json=created, headers=auth_headers)
+
+    refreshed = client.get(f"/game-configurations/{config_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert client.get("/game-configurations/", headers={**auth_headers, "If-None-Match": list_etag}).status_code == 200
+
+    # Deleting one configuration and creating another with a stale client clock still changes the list
+    list_etag = client.get("/game-configurations/", headers=auth_headers).headers["etag"]
+    client.delete(f"/game-configurations/{config_id}", headers=auth_headers)
+    stale = {key: value for key, value in sample_config.items() if key != "id"}
+    stale["updated_at"] = "2000-01-01T00:00:00"
+    recreated = client.post("/game-configurations/", json=stale, headers=auth_headers).json()
+    assert recreated["updated_at"] > "2000-01-02"
+    assert client.get("/game-configurations/", headers={**auth_headers, "If-None-Match": list_etag}).status_code == 200
+
+# Test WebSocket gameplay
+def test_play_websocket(mock_firebase_auth, auth_headers):
+    from main import play_persistence
+
+    sample_config = {
+        "title": "WebSocket Game",
+        "description": "A configuration for WebSocket play tests",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": "Easy",
+                "target_min": 5,
+                "target_max": 10,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+        ],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 2.0,
+        "progression_criteria": {}
+    }
+
+    config_id = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()["id"]
+
+    with client.websocket_connect(f"/ws/play/{config_id}") as websocket:
+        round_frame = websocket.receive_json()
+        assert round_frame["type"] == "round"
+        target = round_frame["target_number"]
+
+        websocket.send_json({"type": "attempt", "addends": [1, 1], "time_taken": 2.0})
+        feedback = websocket.receive_json()
+        assert not feedback["correct"]
+        assert feedback["difference"] == 2 - target
+        assert feedback["tilt"] == -min((target - 2) / target * 2.0, 1.0) * 20
+
+        websocket.send_json({"type": "attempt", "addends": [target - 1, 1], "time_taken": 3.0})
+        feedback = websocket.receive_json()
+        assert feedback["correct"]
+        assert feedback["tilt"] == 0
+        assert feedback["answer_count"] == 2
+
+        websocket.send_json({"type": "attempt", "addends": [target], "time_taken": 1.0})
+        assert websocket.receive_json()["type"] == "error"
+
+    play_persistence.flush()
+    session = client.get(f"/game-sessions/{round_frame['session_id']}", headers=auth_headers).json()
+    assert session["completed"]
+    assert session["success"]
+    assert session["answer_count"] == 2
+
+def test_play_websocket_rejects_bad_attempts(mock_firebase_auth, auth_headers):
+    sample_config = {
+        "title": "WebSocket Validation Game",
+        "description": "A configuration for WebSocket validation tests",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": "Easy",
+                "target_min": 5,
+                "target_max": 10,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+        ],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {}
+    }
+
+    config_id = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()["id"]
+
+    with client.websocket_connect(f"/ws/play/{config_id}") as websocket:
+        websocket.receive_json()
+        for frame in [
+            '{"type": "attempt", "addends": [Infinity], "time_taken": 1.0}',
+            '{"type": "attempt", "addends": [NaN], "time_taken": 1.0}',
+            '{"type": "attempt", "addends": [1, 2]}',
+            '{"type": "attempt", "addends": [1, 2], "time_taken": "nan"}',
+            '{"type": "attempt", "addends": [1, 2], "time_taken": "inf"}',
+            '{"type": "attempt", "addends": [1, 2], "time_taken": -1}',
+            '{"type": "attempt", "addends": "12", "time_taken": 1.0}',
+            '{"type": "attempt", "addends": [2.9, 3.9], "time_taken": 1.0}',
+            '{"type": "attempt", "addends": [true, 4], "time_taken": 1.0}',
+            '{"type": "attempt", "addends": [' + "9" * 400 + '], "time_taken": 1.0}',
+            '{"type": "attempt", "addends": [' + ", ".join(["0"] * 101) + '], "time_taken": 1.0}',
+            '{"type": "complete", "success": "no"}',
+        ]:
+            websocket.send_text(frame)
+            assert websocket.receive_json()["type"] == "error"
+
+        # The connection survives and still plays
+        websocket.send_json({"type": "attempt", "addends": [1, 1], "time_taken": 1.0})
+        feedback = websocket.receive_json()
+        assert feedback["type"] == "feedback"
+        assert feedback["sum"] == 2
+
+        websocket.send_json({"type": "complete", "success": False})
+        completed = websocket.receive_json()
+        assert completed["type"] == "completed"
+        assert completed["success"] is False
+
+def test_play_persistence_reports_failed_rows():
+    from main import PlayPersistence
+
+    persistence = PlayPersistence(retries=0)
+    failures = []
+    persistence.on_failure = lambda kind, row: failures.append((kind, row))
+    persistence.submit("progress", {"user_id": None, "configuration_id": None, "state": None})
+    persistence.flush()
+
+    assert [kind for kind, _ in failures] == ["progress"]
+
+def test_play_persistence_isolates_bad_rows():
+    import uuid
+    from main import PlayPersistence
+
+    persistence = PlayPersistence(retries=1, retry_delay=0)
+    session_id = str(uuid.uuid4())
+    good = {
+        "id": str(uuid.uuid4()), "session_id": session_id, "user_id": "anonymous", "addends": [1, 2],
+        "sum": 3, "target": 3, "correct": True, "time_taken": 1.0
+    }
+    bad = {**good, "id": str(uuid.uuid4()), "time_taken": None}
+    session = {
+        "id": session_id, "user_id": "anonymous", "configuration_id": "persistence-test",
+        "difficulty_level": "Easy", "target_number": 3, "answer_count": 2, "completed": True, "success": True
+    }
+
+    failed = persistence._persist([("attempt", bad), ("attempt", good), ("session", session)])
+
+    assert failed == [("attempt", bad)]
+    assert client.get(f"/game-sessions/{session_id}").json()["answer_count"] == 2
+    exported = client.get(f"/admin/export/attempts?config_id=persistence-test&compress=false").text
+    assert good["id"] in exported
+    assert bad["id"] not in exported
+
+def test_play_websocket_unknown_config():
+    with client.websocket_connect("/ws/play/does-not-exist") as websocket:
+        assert websocket.receive_json()["type"] == "error"
+
+# Test adaptive difficulty
+def test_progression_moves_next_session_level(mock_firebase_auth, auth_headers):
+    import time
+    from main import play_persistence, progression_engine, start_progression_flusher, stop_progression_flusher
+
+    level = {
+        "target_min": 5,
+        "target_max": 10,
+        "addends": [
+            {"min_value": 1, "max_value": 5},
+            {"min_value": 1, "max_value": 5}
+        ],
+        "time_limit": None,
+        "hints_available": True
+    }
+    sample_config = {
+        "title": "Progression Game",
+        "description": "A configuration for progression tests",
+        "created_by": "test-user-123",
+        "difficulty_levels": [{"level_name": "Easy", **level}, {"level_name": "Hard", **level}],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {"promote_streak": 2}
+    }
+
+    config_id = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()["id"]
+
+    for _ in range(2):
+        session = client.post(f"/game-sessions/?config_id={config_id}", headers=auth_headers).json()
+        assert session["difficulty_level"] == "Easy"
+        client.post(
+            f"/game-sessions/{session['id']}/attempt?time_taken=1.0",
+            json=[session["target_number"]],
+            headers=auth_headers
+        )
+
+    session = client.post(f"/game-sessions/?config_id={config_id}", headers=auth_headers).json()
+    assert session["difficulty_level"] == "Hard"
+
+    # No further traffic: the background flusher writes the state on its own
+    progression_engine.persist_interval = 0.05
+    start_progression_flusher()
+    try:
+        deadline = time.monotonic() + 5
+        while True:
+            play_persistence.flush()
+            progress = client.get(f"/progress/{config_id}", headers=auth_headers)
+            if progress.status_code == 200 or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+    finally:
+        stop_progression_flusher()
+        progression_engine.persist_interval = 30.0
+    progress = progress.json()
+    assert progress["current_level"] == "Hard"
+    assert progress["completed_problems"] == 2
+    assert progress["correct_answers"] == 2
+
+# Test leaderboards
+def test_leaderboard_endpoints(mock_firebase_auth, auth_headers):
+    from main import rebuild_leaderboards
+
+    sample_config = {
+        "title": "Leaderboard Game",
+        "description": "A configuration for leaderboard tests",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": "Easy",
+                "target_min": 5,
+                "target_max": 10,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+        ],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {}
+    }
+
+    config_id = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()["id"]
+    session = client.post(f"/game-sessions/?config_id={config_id}", headers=auth_headers).json()
+    client.post(f"/game-sessions/{session['id']}/attempt?time_taken=4.0", json=[0], headers=auth_headers)
+    client.post(
+        f"/game-sessions/{session['id']}/attempt?time_taken=2.0",
+        json=[session["target_number"]],
+        headers=auth_headers
+    )
+
+    board = client.get(f"/leaderboards/{config_id}?difficulty_level=Easy&metric=fastest", headers=auth_headers).json()
+    assert board == [{
+        "rank": 1, "user_id": "anonymous", "attempts": 2, "correct_answers": 1, "accuracy": 0.5, "best_time": 2.0
+    }]
+
+    # A rebuild from the database gives the same board
+    rebuild_leaderboards()
+    rank = client.get(f"/leaderboards/{config_id}/rank/anonymous?difficulty_level=Easy", headers=auth_headers).json()
+    assert rank["rank"] == 1
+    assert rank["attempts"] == 2
+    assert rank["best_time"] == 2.0
+
+    assert client.get(f"/leaderboards/{config_id}?difficulty_level=Easy&metric=speed", headers=auth_headers).status_code == 400
+
+    for bad_time in ["-1000", "nan", "inf"]:
+        response = client.post(
+            f"/game-sessions/{session['id']}/attempt?time_taken={bad_time}",
+            json=[session["target_number"]],
+            headers=auth_headers
+        )
+        assert response.status_code == 422
+
+    # Deleted configurations stay off the boards after a rebuild
+    client.delete(f"/game-configurations/{config_id}", headers=auth_headers)
+    rebuild_leaderboards()
+    assert client.get(f"/leaderboards/{config_id}?difficulty_level=Easy", headers=auth_headers).json() == []
+
+# Test configuration cache invalidation
+def test_config_update_invalidates_cache(mock_firebase_auth, auth_headers):
+    sample_config = {
+        "title": "Cached Game",
+        "description": "A configuration for cache tests",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": "Easy",
+                "target_min": 5,
+                "target_max": 5,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+        ],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {}
+    }
+
+    created = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()
+    config_id = created["id"]
+    assert client.post(f"/game-sessions/?config_id={config_id}", headers=auth_headers).json()["target_number"] == 5
+
+    created["difficulty_levels"][0]["target_min"] = 7
+    created["difficulty_levels"][0]["target_max"] = 7
+    client.put(f"/game-configurations/{config_id}", json=created, headers=auth_headers)
+    assert client.post(f"/game-sessions/?config_id={config_id}", headers=auth_headers).json()["target_number"] == 7
+
+    client.delete(f"/game-configurations/{config_id}", headers=auth_headers)
+    assert client.post(f"/game-sessions/?config_id={config_id}", headers=auth_headers).status_code == 404
+
+def test_attempt_after_levels_removed(mock_firebase_auth, auth_headers):
+    sample_config = {
+        "title": "Emptied Game",
+        "description": "A configuration whose levels are removed mid-session",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": "Easy",
+                "target_min": 5,
+                "target_max": 10,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+        ],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {}
+    }
+
+    created = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()
+    session = client.post(f"/game-sessions/?config_id={created['id']}", headers=auth_headers).json()
+
+    created["difficulty_levels"] = []
+    client.put(f"/game-configurations/{created['id']}", json=created, headers=auth_headers)
+
+    response = client.post(f"/game-sessions/{session['id']}/attempt?time_taken=1.0", json=[0], headers=auth_headers)
+    assert response.status_code == 200
+
+def test_writes_pin_reads_to_primary(mock_firebase_auth, auth_headers):
+    import main
+
+    sample_config = {
+        "title": "Replicated Game",
+        "description": "A configuration for read-your-writes tests",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": "Easy",
+                "target_min": 5,
+                "target_max": 10,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+        ],
+        "starting_level": "Easy",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {}
+    }
+    config_id = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()["id"]
+
+    read_session = main.db_router.read_session
+    with patch.object(main.db_router, "replicas", [main.engine]), \
+            patch.object(main.db_router, "read_session", side_effect=read_session) as routed:
+        response = client.post(f"/game-sessions/?config_id={config_id}", headers=auth_headers)
+        primary_until = response.headers["X-Primary-Until"]
+        assert response.cookies["primary_until"] == primary_until
+
+        client.get(f"/game-sessions/{response.json()['id']}", headers={**auth_headers, "X-Primary-Until": primary_until})
+        routed.assert_called_with(float(primary_until))
+
+def test_renamed_level_falls_back_to_starting_level(mock_firebase_auth, auth_headers):
+    sample_config = {
+        "title": "Renamed Level Game",
+        "description": "A configuration whose starting level is renamed",
+        "created_by": "test-user-123",
+        "difficulty_levels": [
+            {
+                "level_name": level_name,
+                "target_min": 5,
+                "target_max": 10,
+                "addends": [
+                    {"min_value": 1, "max_value": 5},
+                    {"min_value": 1, "max_value": 5}
+                ],
+                "time_limit": None,
+                "hints_available": True
+            }
+            for level_name in ["Easy", "Medium"]
+        ],
+        "starting_level": "Medium",
+        "public": True,
+        "feedback_sensitivity": 1.0,
+        "progression_criteria": {}
+    }
+
+    created = client.post("/game-configurations/", json=sample_config, headers=auth_headers).json()
+    session = client.post(f"/game-sessions/?config_id={created['id']}", headers=auth_headers).json()
+    assert session["difficulty_level"] == "Medium"
+
+    created["difficulty_levels"][1]["level_name"] = "Standard"
+    created["starting_level"] = "Standard"
+    client.put(f"/game-configurations/{created['id']}", json=created, headers=auth_headers)
+
+    client.post(f"/game-sessions/{session['id']}/attempt?time_taken=1.0", json=[0], headers=auth_headers)
+    next_session = client.post(f"/game-sessions/?config_id={created['id']}", headers=auth_headers).json()
+    assert next_session["difficulty_level"] == "Standard"
@@ -0,0 +1,92 @@
+# test_progression.py
+from progression import ProgressionCriteria, ProgressionEngine, ProgressionState, evaluate
+
+LEVELS = ["Easy", "Medium", "Hard"]
+
+def test_window_statistics():
+    state = ProgressionState("Easy", window=4)
+    for correct, time_taken in [(True, 4.0), (False, 1.0), (True, 3.0), (True, 2.0)]:
+        state.record(correct, time_taken)
+
+    assert state.accuracy == 0.75
+    assert state.median_time == 2.5
+    assert state.streak == 2
+
+    # The oldest attempt (correct, 4.0s) falls out of the window
+    state.record(False, 10.0)
+    assert state.count == 4
+    assert state.accuracy == 0.5
+    assert state.median_time == 2.5
+    assert state.streak == -1
+    assert state.completed_problems == 5
+    assert state.correct_answers == 3
+
+def test_state_round_trip():
+    state = ProgressionState("Medium", window=3)
+    for correct, time_taken in [(True, 1.0), (False, 5.0), (True, 2.0), (True, 7.0)]:
+        state.record(correct, time_taken)
+
+    restored = ProgressionState.from_dict(state.to_dict())
+
+    assert restored.level == "Medium"
+    assert restored.accuracy == state.accuracy
+    assert restored.median_time == state.median_time
+    assert restored.streak == state.streak
+    restored.record(False, 3.0)
+    state.record(False, 3.0)
+    assert restored.to_dict() == state.to_dict()
+
+def test_evaluate_uses_accuracy_and_median_time():
+    criteria = ProgressionCriteria(window=5, min_attempts=5, promote_streak=None, demote_streak=None, max_median_time=3.0)
+    state = ProgressionState("Easy", window=5)
+    for correct in [True, True, False, True, True]:
+        state.record(correct, 5.0)
+
+    # Accurate enough, but too slow to promote
+    assert evaluate(state, criteria) == 0
+    assert evaluate(state, criteria.copy(update={"max_median_time": None})) == 1
+
+def test_engine_promotes_and_demotes():
+    engine = ProgressionEngine(persist_interval=0)
+    engine.put("user", "config", ProgressionState("Easy", window=10))
+    criteria = ProgressionCriteria(promote_streak=3, demote_streak=2)
+
+    for _ in range(3):
+        state = engine.record_attempt("user", "config", LEVELS, criteria, True, 1.0)
+    assert state.level == "Medium"
+    assert state.count == 0
+
+    for _ in range(2):
+        state = engine.record_attempt("user", "config", LEVELS, criteria, False, 1.0)
+    assert state.level == "Easy"
+
+    # Already at the bottom, so further misses keep the player on Easy
+    for _ in range(2):
+        state = engine.record_attempt("user", "config", LEVELS, criteria, False, 1.0)
+    assert state.level == "Easy"
+
+    snapshots = engine.drain_dirty()
+    assert [snapshot["state"]["level"] for snapshot in snapshots] == ["Easy"]
+    assert engine.drain_dirty() == []
+
+    # A snapshot whose write failed is taken again on the next drain
+    engine.mark_dirty("user", "config")
+    assert len(engine.drain_dirty()) == 1
+
+def test_engine_without_levels_keeps_statistics():
+    engine = ProgressionEngine()
+    engine.put("user", "config", ProgressionState("Easy", window=10))
+
+    state = engine.record_attempt("user", "config", [], ProgressionCriteria(), True, 1.0)
+
+    assert state.level == "Easy"
+    assert state.completed_problems == 1
+
+def test_engine_returns_to_starting_level_when_level_removed():
+    engine = ProgressionEngine()
+    engine.put("user", "config", ProgressionState("Medium", window=10))
+
+    # "Medium" was renamed; the player goes to the configuration's starting level
+    state = engine.record_attempt("user", "config", ["Easy", "Standard"], ProgressionCriteria(), True, 1.0, "Standard")
+
+    assert state.level == "Standard"
@@ -0,0 +1,63 @@
+# test_replicas.py
+import time
+
+from sqlalchemy import create_engine, text
+
+from replicas import ReplicaRouter
+
+def _database(path, name):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE source (name VARCHAR)"))
+        connection.execute(text("INSERT INTO source VALUES (:name)"), {"name": name})
+    return engine
+
+def _source(session):
+    try:
+        return session.execute(text("SELECT name FROM source")).scalar()
+    finally:
+        session.close()
+
+def test_reads_go_to_replicas_with_read_your_writes(tmp_path):
+    primary = _database(tmp_path / "primary.db", "primary")
+    replica = _database(tmp_path / "replica.db", "replica")
+    router = ReplicaRouter(primary, [replica], stickiness=0.2)
+
+    assert _source(router.read_session()) == "replica"
+
+    # The writer carries its primary-until time back; any router instance honours it
+    primary_until = router.primary_until()
+    other_worker = ReplicaRouter(primary, [replica], stickiness=0.2)
+    assert _source(router.read_session(primary_until)) == "primary"
+    assert _source(other_worker.read_session(primary_until)) == "primary"
+    # Other clients keep reading from the replica
+    assert _source(router.read_session()) == "replica"
+    # Times we could not have issued are ignored
+    assert _source(router.read_session(time.time() + 3600)) == "replica"
+
+    time.sleep(0.25)
+    assert _source(router.read_session(primary_until)) == "replica"
+
+def test_unhealthy_replicas_leave_rotation(tmp_path):
+    primary = _database(tmp_path / "primary.db", "primary")
+    first = _database(tmp_path / "first.db", "first")
+    second = _database(tmp_path / "second.db", "second")
+    router = ReplicaRouter(primary, [first, second])
+
+    assert {_source(router.read_session()) for _ in range(4)} == {"first", "second"}
+
+    router.replicas[1] = create_engine(f"sqlite:///{tmp_path}/missing/second.db")
+    router.check_health()
+    assert {_source(router.read_session()) for _ in range(4)} == {"first"}
+
+    router.replicas[0] = create_engine(f"sqlite:///{tmp_path}/missing/first.db")
+    router.check_health()
+    assert _source(router.read_session()) == "primary"
+
+def test_without_replicas_everything_uses_the_primary(tmp_path):
+    primary = _database(tmp_path / "primary.db", "primary")
+    router = ReplicaRouter(primary, [])
+
+    assert router.primary_until() is None
+    assert _source(router.read_session(time.time() + 1)) == "primary"
+    assert _source(router.read_session()) == "primary"